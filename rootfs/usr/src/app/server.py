@@ -2,21 +2,36 @@
 """Dashboard Streams - Stream Home Assistant dashboards to smart TVs via HLS."""
 
 import asyncio
-import io
+import binascii
+import fcntl
+import gzip
+import hashlib
 import json
 import logging
+import math
 import os
+import re
 import shutil
-import subprocess
 import signal
+import socket
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
+import aiohttp
 from aiohttp import web
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
-from PIL import Image
+from selenium.webdriver.support.ui import WebDriverWait
+
+try:
+    import uvloop
+except ImportError:  # No wheels for 32-bit ARM/x86, use the stock asyncio loop
+    uvloop = None
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -25,18 +40,198 @@ logger = logging.getLogger(__name__)
 
 # Configuration
 CONFIG_PATH = Path("/data/options.json")
-HLS_DIR = Path("/tmp/hls")
+# /dev/shm is always tmpfs, so segment writes never reach the SD card
+HLS_DIR = Path("/dev/shm/hls")
+CHROME_DIR = Path("/tmp/chrome")
+
+# Pending bytes on FFmpeg's stdin before write_frame() waits for it to catch up
+STDIN_BUFFER_HIGH = 1024 * 1024
+# Kernel buffer of the stdin pipe itself. 1 MiB is the default
+# pipe-max-size, the most an unprivileged process may ask for.
+STDIN_PIPE_SIZE = 1024 * 1024
+
+# Finished HLS files kept in memory: the live window (hls_list_size), the
+# init segment and the segment being fetched as the window moves on
+SEGMENT_CACHE_SIZE = 8
+
+# Socket option to send ACKs immediately (Linux only)
+_TCP_QUICKACK = getattr(socket, "TCP_QUICKACK", None)
+
+# Upper bound on waiting for the dashboard to render after navigation
+DASHBOARD_LOAD_TIMEOUT = 15
+
+# Nice value for FFmpeg, so a busy host delays capture rather than encoding
+ENCODER_NICENESS = -5
+
+# Device nodes that indicate a usable hardware H.264 encoder
+V4L2_ENCODER_DEVICE = Path("/dev/video11")  # Raspberry Pi's bcm2835 V4L2 M2M
+NVIDIA_DEVICE = Path("/dev/nvidia0")
+VAAPI_DEVICE = Path("/dev/dri/renderD128")  # Intel/AMD
+
+# Unchanged frames are not re-sent to FFmpeg, except once per this many
+# seconds so segments keep getting cut. Keyframes are forced at every segment
+# boundary and segment_duration is at least 1s, so each segment still gets one.
+UNCHANGED_FRAME_HEARTBEAT = 1.0
+
+# Default JPEG quality (jpeg_quality option) for frames captured from Chromium.
+# Frames are re-encoded to H.264 by FFmpeg, so this only needs to be high
+# enough to keep text crisp.
+FRAME_JPEG_QUALITY = 80
+
+# Matches kiosk-mode resource URLs, entity IDs and attributes without having
+# to lowercase every string first
+_KIOSK_RE = re.compile(r"kiosk[-_ ]?mode", re.IGNORECASE)
+
+# Entity attributes that identify the repository behind HACS/update entities
+_HACS_ATTRIBUTE_KEYS = (
+    "repository",
+    "name",
+    "integration",
+    "source",
+    "title",
+    "release_url",
+)
+
+# Rendered by Home Assistant with the two values above as `pattern` and
+# `keys`. Prints the ID of every entity whose ID, or one of those attributes,
+# mentions kiosk-mode.
+_KIOSK_STATES_TEMPLATE = """
+{%- for s in states
+      if s.entity_id is search(pattern, true)
+      or s.attributes.items()
+         | selectattr(0, 'in', keys)
+         | map(attribute=1)
+         | select('string')
+         | select('search', pattern, true)
+         | list -%}
+{{ s.entity_id }}
+{% endfor -%}
+"""
+
+
+class _LazyJson:
+    """Log argument that is only JSON-encoded if the record is emitted."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self) -> str:
+        return json.dumps(self.data, indent=2)
 
 
 class DashboardCapture:
     """Captures screenshots from Home Assistant dashboards."""
 
+    # Stores the HA frontend auth tokens. The token data is passed as a script
+    # argument, so it never has to be escaped into the JavaScript source.
+    _AUTH_SCRIPT = 'localStorage.setItem("hassTokens", arguments[0]);'
+
+    # Flags DOM changes, including inside shadow roots (the HA frontend is
+    # built from web components), by observing each root as it is attached
+    _CHANGE_OBSERVER_SCRIPT = """
+        (function() {
+            window.__dashboardChanged = true;
+            const observer = new MutationObserver(() => {
+                window.__dashboardChanged = true;
+            });
+            const options = {
+                subtree: true,
+                childList: true,
+                attributes: true,
+                characterData: true,
+            };
+            const attachShadow = Element.prototype.attachShadow;
+            Element.prototype.attachShadow = function(init) {
+                const root = attachShadow.call(this, init);
+                observer.observe(root, options);
+                return root;
+            };
+            observer.observe(document, options);
+        })();
+    """
+
+    # Reads and clears the change flag. Reports a change if the observer
+    # isn't installed, so capture falls back to polling.
+    _TAKE_CHANGED_SCRIPT = """
+        const changed = window.__dashboardChanged !== false;
+        window.__dashboardChanged = false;
+        return changed;
+    """
+
+    # Whether the HA frontend has rendered a panel (dashboard, map, ...). The
+    # router shows hass-loading-screen while a panel loads, and Lovelace shows
+    # its own until the dashboard config has loaded and hui-root is rendered.
+    _PANEL_READY_SCRIPT = """
+        const main = document.querySelector("home-assistant")
+            ?.shadowRoot?.querySelector("home-assistant-main");
+        const panel = main?.shadowRoot?.querySelector(
+            "partial-panel-resolver > :not(hass-loading-screen)"
+        );
+        if (!panel) return false;
+        if (panel.localName !== "ha-panel-lovelace") return true;
+        return Boolean(panel.shadowRoot?.querySelector("hui-root"));
+    """
+
+    # Reloads the page when the dashboard configuration is saved
+    _AUTO_REFRESH_SCRIPT = """
+        (function() {
+            // Avoid duplicate injection
+            if (window.__dashboardAutoRefreshActive) return;
+            window.__dashboardAutoRefreshActive = true;
+
+            console.log('[Dashboard Streams] Setting up auto-refresh on dashboard updates...');
+
+            // Get the hass object from the DOM
+            function getHassConnection() {
+                const haRoot = document.querySelector('home-assistant');
+                return haRoot?.__hass?.connection || haRoot?.hass?.connection;
+            }
+
+            function subscribeToUpdates() {
+                const connection = getHassConnection();
+                if (!connection) {
+                    // Retry in 1 second if not ready yet
+                    console.log('[Dashboard Streams] Waiting for hass connection...');
+                    setTimeout(subscribeToUpdates, 1000);
+                    return;
+                }
+
+                console.log('[Dashboard Streams] Found hass connection, subscribing to lovelace_updated...');
+
+                connection.subscribeEvents((event) => {
+                    console.log('[Dashboard Streams] Dashboard updated, refreshing...', event);
+                    location.reload();
+                }, 'lovelace_updated').then(() => {
+                    console.log('[Dashboard Streams] Subscribed to lovelace_updated events');
+                }).catch((err) => {
+                    console.error('[Dashboard Streams] Failed to subscribe:', err);
+                });
+            }
+
+            // Start subscription attempt
+            subscribeToUpdates();
+        })();
+    """
+
     def __init__(self, config: dict):
         self.config = config
         self.access_token = config.get("access_token", "")
+        # Read once, capture_frame() runs for every frame. Snapshots use it too.
+        self.frame_quality = config.get("jpeg_quality", FRAME_JPEG_QUALITY)
+        self.dashboard_url = self._kiosk_url(
+            config["dashboard_url"], config.get("kiosk_mode", True)
+        )
+        self._full_url, self._base_url = self._resolve_urls(self.dashboard_url)
         self.driver: Optional[webdriver.Chrome] = None
-        self.lock = asyncio.Lock()
+        # Most recent frame from capture_frame(), reused for snapshots
+        self.latest_frame: Optional[bytes] = None
+        # ChromeDriver sessions are single-threaded, so run every driver call
+        # on one dedicated thread. This serializes access to the browser and
+        # keeps it off the default executor used by aiohttp.
+        self._cdp_exec = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cdp")
         self.kiosk_mode_detected: Optional[bool] = None
+        self._kiosk_task: Optional[asyncio.Task] = None
+        self._http: Optional[aiohttp.ClientSession] = None
 
     def _create_driver(self) -> webdriver.Chrome:
         """Create a headless Chrome driver optimized for Pi."""
@@ -52,7 +247,13 @@ class DashboardCapture:
         options.add_argument("--disable-translate")
         options.add_argument("--disable-default-apps")
         options.add_argument("--no-first-run")
-        options.add_argument("--single-process")  # Reduce memory on Pi
+        # Keep the renderer in its own process so screenshots don't block page
+        # updates, and trade some rendering work for memory on the Pi instead
+        options.add_argument("--enable-low-end-device-mode")
+        # Fixed profile and a small disk cache, away from the HLS output dir
+        options.add_argument(f"--user-data-dir={CHROME_DIR / 'profile'}")
+        options.add_argument(f"--disk-cache-dir={CHROME_DIR / 'cache'}")
+        options.add_argument("--disk-cache-size=33554432")
         options.add_argument(
             f"--window-size={self.config.get('width', 1920)},{self.config.get('height', 1080)}"
         )
@@ -65,13 +266,23 @@ class DashboardCapture:
 
     async def start(self):
         """Start the browser and navigate to the dashboard."""
-        loop = asyncio.get_event_loop()
-        self.driver = await loop.run_in_executor(None, self._create_driver)
+        loop = asyncio.get_running_loop()
+        self.driver = await loop.run_in_executor(self._cdp_exec, self._create_driver)
+
+        # Track DOM changes on every page load, so the capture loop can skip
+        # screenshots while the dashboard is idle
+        await loop.run_in_executor(
+            self._cdp_exec,
+            lambda: self.driver.execute_cdp_cmd(
+                "Page.addScriptToEvaluateOnNewDocument",
+                {"source": self._CHANGE_OBSERVER_SCRIPT},
+            ),
+        )
 
         # Force dark mode via CDP if enabled
         if self.config.get("dark_mode", True):
             await loop.run_in_executor(
-                None,
+                self._cdp_exec,
                 lambda: self.driver.execute_cdp_cmd(
                     "Emulation.setEmulatedMedia",
                     {"features": [{"name": "prefers-color-scheme", "value": "dark"}]},
@@ -82,73 +293,79 @@ class DashboardCapture:
         await self._navigate_to_dashboard()
         logger.info("Dashboard capture started")
 
-    async def _navigate_to_dashboard(self):
-        """Navigate to the Home Assistant dashboard."""
-        dashboard_url = self.config["dashboard_url"]
-        kiosk_mode = self.config.get("kiosk_mode", True)
-
-        # Append ?kiosk if kiosk_mode is enabled and not already present
+    @staticmethod
+    def _kiosk_url(dashboard_url: str, kiosk_mode: bool) -> str:
+        """Append ?kiosk if kiosk_mode is enabled and not already present."""
         if kiosk_mode and "kiosk" not in dashboard_url:
             if "?" in dashboard_url:
                 dashboard_url = f"{dashboard_url}&kiosk"
             else:
                 dashboard_url = f"{dashboard_url}?kiosk"
             logger.info(f"Kiosk mode enabled, URL: {dashboard_url}")
+        return dashboard_url
 
-        # Determine the base URL and full URL
-        if dashboard_url.startswith("http://") or dashboard_url.startswith("https://"):
+    @staticmethod
+    def _resolve_urls(dashboard_url: str) -> tuple[str, Optional[str]]:
+        """Return the full dashboard URL and the base URL of its HA instance."""
+        if dashboard_url.startswith(("http://", "https://")):
             # External URL (for testing or external dashboards)
-            full_url = dashboard_url
-            base_url = "/".join(full_url.split("/")[:3])
-        elif dashboard_url.startswith("/"):
+            return dashboard_url, "/".join(dashboard_url.split("/")[:3])
+        if dashboard_url.startswith("/"):
             # Relative path - use internal HA connection
             # 'homeassistant' is the internal hostname for HA core in the Docker network
             base_url = "http://homeassistant:8123"
-            full_url = f"{base_url}{dashboard_url}"
-        else:
-            full_url = dashboard_url
-            base_url = None
+            return f"{base_url}{dashboard_url}", base_url
+        return dashboard_url, None
+
+    async def _navigate_to_dashboard(self):
+        """Navigate to the Home Assistant dashboard."""
+        full_url, base_url = self._full_url, self._base_url
 
         # Use the long-lived access token we created
         token = self.access_token
 
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
 
         def navigate():
-            import time
-
             if token and base_url:
                 logger.info(f"Setting up authentication for {base_url}")
 
-                # First navigate to base URL to initialize the page
+                # First navigate to base URL to initialize the page. get()
+                # returns after the load event, so localStorage is usable.
                 self.driver.get(base_url)
-                time.sleep(2)
 
                 # Inject the long-lived access token into localStorage
                 # Format based on HA frontend's auth storage
-                self.driver.execute_script(f"""
-                    // Store token in the format HA frontend expects
-                    const tokenData = {{
-                        hassUrl: "{base_url}",
-                        clientId: "{base_url}/",
-                        expires: Date.now() + 315360000000,  // 10 years (long-lived token)
-                        refresh_token: "",
-                        access_token: "{token}",
-                        expires_in: 315360000,
-                        token_type: "Bearer"
-                    }};
-                    localStorage.setItem("hassTokens", JSON.stringify(tokenData));
-                    console.log("Token injected:", tokenData.hassUrl);
-                """)
-
-                logger.info("Token injected, refreshing page")
-                time.sleep(1)
+                token_data = {
+                    "hassUrl": base_url,
+                    "clientId": f"{base_url}/",
+                    # 10 years (long-lived token)
+                    "expires": int(time.time() * 1000) + 315360000000,
+                    "refresh_token": "",
+                    "access_token": token,
+                    "expires_in": 315360000,
+                    "token_type": "Bearer",
+                }
+                self.driver.execute_script(self._AUTH_SCRIPT, json.dumps(token_data))
+
+                logger.info("Token injected, loading dashboard")
 
             logger.info(f"Navigating to: {full_url}")
             self.driver.get(full_url)
 
-            # Wait for page to load
-            time.sleep(5)
+            # Wait until the frontend has rendered the panel, or bounced us to
+            # the login page, instead of sleeping for a fixed time
+            try:
+                WebDriverWait(
+                    self.driver, DASHBOARD_LOAD_TIMEOUT, poll_frequency=0.1
+                ).until(
+                    lambda d: "auth" in d.current_url
+                    or d.execute_script(self._PANEL_READY_SCRIPT)
+                )
+            except TimeoutException:
+                logger.warning(
+                    f"Dashboard did not finish loading within {DASHBOARD_LOAD_TIMEOUT}s"
+                )
 
             # Log debug info
             logger.info(f"Current URL: {self.driver.current_url}")
@@ -163,70 +380,33 @@ class DashboardCapture:
                 except:
                     pass
 
-        await loop.run_in_executor(None, navigate)
+        await loop.run_in_executor(self._cdp_exec, navigate)
         logger.info(f"Navigated to dashboard: {full_url}")
 
+        # Check if kiosk-mode is installed in the background: only the web UI
+        # reports the result, so capture doesn't have to wait for the API.
+        # Replace any check still running, so stop() can always cancel it.
+        await self._cancel_kiosk_check()
+        self._kiosk_task = asyncio.create_task(self._check_kiosk_mode())
+
         # Inject auto-refresh script for dashboard updates
         await self._inject_auto_refresh()
 
-        # Check if kiosk-mode is installed (after page load)
-        await self._check_kiosk_mode()
-
     async def _inject_auto_refresh(self):
         """Inject JavaScript to auto-refresh when dashboard is updated."""
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
 
         def inject():
             try:
-                self.driver.execute_script("""
-                    (function() {
-                        // Avoid duplicate injection
-                        if (window.__dashboardAutoRefreshActive) return;
-                        window.__dashboardAutoRefreshActive = true;
-                        
-                        console.log('[Dashboard Streams] Setting up auto-refresh on dashboard updates...');
-                        
-                        // Get the hass object from the DOM
-                        function getHassConnection() {
-                            const haRoot = document.querySelector('home-assistant');
-                            return haRoot?.__hass?.connection || haRoot?.hass?.connection;
-                        }
-                        
-                        function subscribeToUpdates() {
-                            const connection = getHassConnection();
-                            if (!connection) {
-                                // Retry in 1 second if not ready yet
-                                console.log('[Dashboard Streams] Waiting for hass connection...');
-                                setTimeout(subscribeToUpdates, 1000);
-                                return;
-                            }
-                            
-                            console.log('[Dashboard Streams] Found hass connection, subscribing to lovelace_updated...');
-                            
-                            connection.subscribeEvents((event) => {
-                                console.log('[Dashboard Streams] Dashboard updated, refreshing...', event);
-                                location.reload();
-                            }, 'lovelace_updated').then(() => {
-                                console.log('[Dashboard Streams] Subscribed to lovelace_updated events');
-                            }).catch((err) => {
-                                console.error('[Dashboard Streams] Failed to subscribe:', err);
-                            });
-                        }
-                        
-                        // Start subscription attempt
-                        subscribeToUpdates();
-                    })();
-                """)
+                self.driver.execute_script(self._AUTO_REFRESH_SCRIPT)
                 logger.info("Auto-refresh script injected")
             except Exception as e:
                 logger.warning(f"Failed to inject auto-refresh script: {e}")
 
-        await loop.run_in_executor(None, inject)
+        await loop.run_in_executor(self._cdp_exec, inject)
 
     async def _check_kiosk_mode(self):
         """Check if kiosk-mode HACS integration is installed via HA API."""
-        import aiohttp
-
         # Use SUPERVISOR_TOKEN for Supervisor API calls
         supervisor_token = os.environ.get("SUPERVISOR_TOKEN")
         if not supervisor_token:
@@ -236,67 +416,63 @@ class DashboardCapture:
             self.kiosk_mode_detected = None
             return
 
-        # Supervisor API to proxy to Home Assistant Core API
-        base_url = "http://supervisor/core/api"
-        headers = {
-            "Authorization": f"Bearer {supervisor_token}",
-            "Content-Type": "application/json",
-        }
+        # Keep one keep-alive session to the Supervisor API (which proxies to
+        # the Home Assistant Core API) for the add-on lifetime
+        if self._http is None:
+            self._http = aiohttp.ClientSession(
+                base_url="http://supervisor",
+                headers={"Authorization": f"Bearer {supervisor_token}"},
+                connector=aiohttp.TCPConnector(limit=4, keepalive_timeout=60),
+            )
+        session = self._http
 
         try:
-            async with aiohttp.ClientSession() as session:
-                # Method 1: Check Lovelace resources for kiosk-mode
-                async with session.get(
-                    f"{base_url}/lovelace/resources",
-                    headers=headers,
-                ) as resp:
-                    logger.info(f"Lovelace resources API status: {resp.status}")
-                    if resp.status == 200:
-                        data = await resp.json()
-                        resources = (
-                            data if isinstance(data, list) else data.get("result", [])
-                        )
-                        logger.info(f"Lovelace resources: {resources}")
-                        for resource in resources:
-                            url = resource.get("url", "")
-                            if "kiosk-mode" in url.lower():
-                                logger.info(
-                                    f"Kiosk-mode found in Lovelace resources: {url}"
-                                )
-                                self.kiosk_mode_detected = True
-                                return
-                    else:
-                        body = await resp.text()
-                        logger.warning(
-                            f"Lovelace resources API returned {resp.status}: {body}"
-                        )
-
-                # Method 2: Check HACS installed packages (if HACS websocket not available, try states)
-                async with session.get(
-                    f"{base_url}/states",
-                    headers=headers,
-                ) as resp:
-                    logger.info(f"States API status: {resp.status}")
-                    if resp.status == 200:
-                        states = await resp.json()
-                        for state in states:
-                            entity_id = state.get("entity_id", "")
-                            # HACS creates update entities for installed packages
-                            if (
-                                "kiosk" in entity_id.lower()
-                                and "mode" in entity_id.lower()
-                            ):
-                                logger.info(f"Kiosk-mode found via entity: {entity_id}")
-                                self.kiosk_mode_detected = True
-                                return
-                            # Also check attributes for HACS sensors
-                            attrs = state.get("attributes", {})
-                            if "kiosk-mode" in str(attrs).lower():
-                                logger.info(
-                                    f"Kiosk-mode found in entity attributes: {entity_id}"
-                                )
-                                self.kiosk_mode_detected = True
-                                return
+            # Method 1: Check Lovelace resources for kiosk-mode
+            async with session.get("/core/api/lovelace/resources") as resp:
+                logger.info(f"Lovelace resources API status: {resp.status}")
+                if resp.status == 200:
+                    data = await resp.json()
+                    resources = (
+                        data if isinstance(data, list) else data.get("result", [])
+                    )
+                    logger.info(f"Lovelace resources: {resources}")
+                    for resource in resources:
+                        url = resource.get("url", "")
+                        if _KIOSK_RE.search(url):
+                            logger.info(
+                                f"Kiosk-mode found in Lovelace resources: {url}"
+                            )
+                            self.kiosk_mode_detected = True
+                            return
+                else:
+                    body = await resp.text()
+                    logger.warning(
+                        f"Lovelace resources API returned {resp.status}: {body}"
+                    )
+
+            # Method 2: Look for the HACS update entity (or any entity naming
+            # kiosk-mode). Home Assistant filters its states with a template,
+            # so only the matching entity IDs come back instead of every state.
+            async with session.post(
+                "/core/api/template",
+                json={
+                    "template": _KIOSK_STATES_TEMPLATE,
+                    "variables": {
+                        "pattern": _KIOSK_RE.pattern,
+                        "keys": _HACS_ATTRIBUTE_KEYS,
+                    },
+                },
+            ) as resp:
+                logger.info(f"Template API status: {resp.status}")
+                if resp.status == 200:
+                    matches = (await resp.text()).split()
+                    if matches:
+                        logger.info(f"Kiosk-mode found via entity: {matches[0]}")
+                        self.kiosk_mode_detected = True
+                        return
+                else:
+                    body = await resp.text()
+                    logger.warning(f"Template API returned {resp.status}: {body}")
 
             # If we got here, kiosk-mode wasn't found
             logger.warning("Kiosk-mode not found via API")
@@ -305,82 +481,60 @@ class DashboardCapture:
         except Exception as e:
             logger.warning(f"Error checking for kiosk-mode via API: {e}")
             self.kiosk_mode_detected = None
-            return
 
-        # Use Supervisor API to talk to Home Assistant
-        base_url = "http://supervisor/core/api"
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-        }
-
-        try:
-            async with aiohttp.ClientSession() as session:
-                # Query HACS installed repositories via frontend/extra_modules or check for kiosk-mode resources
-                # Method 1: Check Lovelace resources for kiosk-mode
-                async with session.get(
-                    f"{base_url}/lovelace/resources",
-                    headers=headers,
-                ) as resp:
-                    if resp.status == 200:
-                        resources = await resp.json()
-                        # Look for kiosk-mode in the resources
-                        for resource in resources:
-                            url = resource.get("url", "")
-                            if "kiosk-mode" in url.lower():
-                                logger.info(
-                                    f"Kiosk-mode found in Lovelace resources: {url}"
-                                )
-                                self.kiosk_mode_detected = True
-                                return
-                    else:
-                        logger.debug(f"Lovelace resources API returned {resp.status}")
-
-                # Method 2: Check frontend extra_module_url in HA config
-                async with session.get(
-                    f"{base_url}/config",
-                    headers=headers,
-                ) as resp:
-                    if resp.status == 200:
-                        config = await resp.json()
-                        # Check frontend config for kiosk-mode
-                        frontend = config.get("frontend", {})
-                        extra_modules = frontend.get("extra_module_url", [])
-                        for url in extra_modules:
-                            if "kiosk-mode" in url.lower():
-                                logger.info(
-                                    f"Kiosk-mode found in frontend config: {url}"
-                                )
-                                self.kiosk_mode_detected = True
-                                return
-
-            # If we got here, kiosk-mode wasn't found
-            logger.warning(
-                "Kiosk-mode not found in Lovelace resources or frontend config"
+    async def capture_jpeg(self, quality: int) -> bytes:
+        """Capture a JPEG screenshot of the current dashboard."""
+        loop = asyncio.get_running_loop()
+
+        def take_screenshot() -> bytes:
+            # Ask Chromium for JPEG directly via CDP instead of Selenium's
+            # PNG screenshot, so neither side pays for a PNG encode/decode
+            result = self.driver.execute_cdp_cmd(
+                "Page.captureScreenshot",
+                # optimizeForSpeed picks Chromium's fastest encoder settings
+                # at the cost of slightly larger images
+                {"format": "jpeg", "quality": quality, "optimizeForSpeed": True},
             )
-            self.kiosk_mode_detected = False
-
-        except Exception as e:
-            logger.warning(f"Error checking for kiosk-mode via API: {e}")
-            self.kiosk_mode_detected = None
+            # a2b_base64 reads the ASCII str in place; base64.b64decode
+            # would first copy the whole payload into a bytes object
+            return binascii.a2b_base64(result["data"])
+
+        return await loop.run_in_executor(self._cdp_exec, take_screenshot)
+
+    async def page_changed(self) -> bool:
+        """Return whether the dashboard DOM changed since the last call."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._cdp_exec,
+            lambda: bool(self.driver.execute_script(self._TAKE_CHANGED_SCRIPT)),
+        )
 
     async def capture_frame(self) -> bytes:
-        """Capture a PNG screenshot of the current dashboard."""
-        async with self.lock:
-            loop = asyncio.get_event_loop()
-
-            def take_screenshot() -> bytes:
-                return self.driver.get_screenshot_as_png()
+        """Capture a JPEG frame for the HLS encoder."""
+        self.latest_frame = await self.capture_jpeg(self.frame_quality)
+        return self.latest_frame
 
-            return await loop.run_in_executor(None, take_screenshot)
+    async def _cancel_kiosk_check(self):
+        """Cancel the background kiosk-mode check, if one is running."""
+        if self._kiosk_task:
+            self._kiosk_task.cancel()
+            await asyncio.gather(self._kiosk_task, return_exceptions=True)
+            self._kiosk_task = None
 
     async def stop(self):
         """Stop the browser."""
+        await self._cancel_kiosk_check()
+        # A restarted browser must not serve the old page's last frame
+        self.latest_frame = None
         if self.driver:
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, self.driver.quit)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._cdp_exec, self.driver.quit)
             self.driver = None
             logger.info("Dashboard capture stopped")
+        self._cdp_exec.shutdown(wait=False)
+        if self._http:
+            await self._http.close()
+            self._http = None
 
 
 class HLSEncoder:
@@ -388,121 +542,387 @@ class HLSEncoder:
 
     def __init__(self, config: dict):
         self.config = config
-        self.process: Optional[subprocess.Popen] = None
+        self.process: Optional[asyncio.subprocess.Process] = None
         self.running = False
+        self._stderr_task: Optional[asyncio.Task] = None
+        self._encoders: Optional[frozenset[str]] = None
+        self._decoders: Optional[frozenset[str]] = None
+
+    @staticmethod
+    async def _list_codecs(kind: str) -> frozenset[str]:
+        """List the video encoders or decoders compiled into FFmpeg."""
+        proc = await asyncio.create_subprocess_exec(
+            "ffmpeg",
+            "-hide_banner",
+            f"-{kind}",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        out, _ = await proc.communicate()
+        # Codec lines look like " V....D libx264   libx264 H.264 / ..."
+        return frozenset(
+            fields[1]
+            for fields in (line.split() for line in out.decode().splitlines())
+            if len(fields) > 1 and fields[0].startswith("V")
+        )
 
-    def start(self):
-        """Start the FFmpeg HLS encoder process."""
-        # Clean up old segments
+    async def _available_encoders(self) -> frozenset[str]:
+        """List the video encoders compiled into FFmpeg (probed once)."""
+        if self._encoders is None:
+            self._encoders = await self._list_codecs("encoders")
+        return self._encoders
+
+    async def _available_decoders(self) -> frozenset[str]:
+        """List the video decoders compiled into FFmpeg (probed once)."""
+        if self._decoders is None:
+            self._decoders = await self._list_codecs("decoders")
+        return self._decoders
+
+    async def _video_codec_args(self, quality: int) -> tuple[list[str], list[str]]:
+        """Pick the H.264 encoder, preferring hardware encoders when present.
+
+        Returns the FFmpeg arguments for the input (decoder) and the output.
+        """
+        encoders = await self._available_encoders()
+        input_args = ["-vcodec", "mjpeg"]
+
+        if "h264_v4l2m2m" in encoders and V4L2_ENCODER_DEVICE.exists():
+            logger.info(f"Using h264_v4l2m2m hardware encoder ({V4L2_ENCODER_DEVICE})")
+            # The V4L2 M2M encoder has no CRF mode, use a fixed bitrate
+            return input_args, [
+                "-c:v",
+                "h264_v4l2m2m",
+                "-b:v",
+                "2M",
+                "-pix_fmt",
+                "yuv420p",
+            ]
+
+        if "h264_nvenc" in encoders and NVIDIA_DEVICE.exists():
+            logger.info("Using h264_nvenc hardware encoder")
+            pix_fmt = ["-pix_fmt", "yuv420p"]
+            if "mjpeg_cuvid" in await self._available_decoders():
+                # Decode the JPEGs on the GPU too and keep the frames in CUDA
+                # memory, so they never come back to the CPU before NVENC
+                logger.info("Using mjpeg_cuvid hardware decoder")
+                input_args = [
+                    "-hwaccel",
+                    "cuda",
+                    "-hwaccel_output_format",
+                    "cuda",
+                    "-vcodec",
+                    "mjpeg_cuvid",
+                ]
+                pix_fmt = []
+            # NVENC buffers frames by default, -delay 0 and no B-frames keep
+            # it from adding latency
+            return input_args, [
+                "-c:v",
+                "h264_nvenc",
+                "-preset",
+                "p1",
+                "-tune",
+                "ll",
+                "-delay",
+                "0",
+                "-zerolatency",
+                "1",
+                "-bf",
+                "0",
+                "-rc",
+                "constqp",
+                "-qp",
+                str(quality),
+                *pix_fmt,
+            ]
+
+        if "h264_vaapi" in encoders and VAAPI_DEVICE.exists():
+            logger.info(f"Using h264_vaapi hardware encoder ({VAAPI_DEVICE})")
+            # Frames are converted and uploaded to the GPU before encoding
+            return input_args, [
+                "-vaapi_device",
+                str(VAAPI_DEVICE),
+                "-vf",
+                "format=nv12,hwupload",
+                "-c:v",
+                "h264_vaapi",
+                "-qp",
+                str(quality),
+            ]
+
+        return input_args, [
+            "-c:v",
+            "libx264",
+            "-preset",
+            "ultrafast",
+            "-tune",
+            "zerolatency",  # Changed from stillimage to zerolatency
+            "-crf",
+            str(quality),
+            "-pix_fmt",
+            "yuv420p",
+        ]
+
+    @staticmethod
+    def _reset_output_dir() -> Optional[Path]:
+        """Recreate the HLS output directory, moving the old one aside.
+
+        Returns the old directory, to be deleted once FFmpeg is running.
+        """
+        old_dir = None
         if HLS_DIR.exists():
-            shutil.rmtree(HLS_DIR)
+            # A rename is atomic and instant, the old files can go later
+            old_dir = HLS_DIR.with_name(f"{HLS_DIR.name}.old.{time.time_ns()}")
+            HLS_DIR.rename(old_dir)
         HLS_DIR.mkdir(parents=True, exist_ok=True)
+        return old_dir
+
+    @staticmethod
+    def _grow_stdin_pipe(process: asyncio.subprocess.Process):
+        """Size the stdin pipe to hold whole frames instead of 64 KiB."""
+        transport = process.stdin.transport
+        try:
+            pipe = transport.get_extra_info("pipe")
+            sock = transport.get_extra_info("socket")
+            if pipe is not None:
+                fcntl.fcntl(pipe.fileno(), fcntl.F_SETPIPE_SZ, STDIN_PIPE_SIZE)
+            elif sock is not None:
+                # uvloop connects stdin with a socketpair rather than a pipe
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, STDIN_PIPE_SIZE)
+        except (OSError, AttributeError, ValueError) as e:
+            # Pipes are capped by /proc/sys/fs/pipe-max-size when unprivileged
+            logger.debug(f"Could not resize encoder stdin pipe: {e}")
+
+    @staticmethod
+    def _raise_priority(pid: int):
+        """Let FFmpeg preempt Chromium and other add-ons on a busy host."""
+        try:
+            os.setpriority(os.PRIO_PROCESS, pid, ENCODER_NICENESS)
+        except OSError as e:
+            # Needs CAP_SYS_NICE, run at normal priority without it
+            logger.debug(f"Could not raise encoder priority: {e}")
+
+    async def start(self):
+        """Start the FFmpeg HLS encoder process."""
+        # Swap in a fresh output directory off the event loop, restarts happen
+        # while the stream is being served
+        loop = asyncio.get_running_loop()
+        old_dir = await loop.run_in_executor(None, self._reset_output_dir)
 
         # FFmpeg command optimized for LOW LATENCY live streaming
-        # Target: ~3-5 second delay
-        segment_time = self.config.get("segment_duration", 2)  # Short segments
+        # Target: ~2-4 second delay
+        segment_time = self.config.get("segment_duration", 1)  # Short segments
         fps = self.config.get("fps", 5)
         quality = self.config.get("quality", 23)
+        # Segment numbering restarts with FFmpeg, so tag file names with the
+        # start time to keep them unique (and cacheable) across restarts
+        run_id = int(time.time() * 1000)
 
+        input_args, output_args = await self._video_codec_args(quality)
         cmd = [
             "ffmpeg",
             "-y",
+            # Only report problems; per-frame stats would just be noise here
+            "-loglevel",
+            "warning",
+            "-nostats",
             "-f",
             "image2pipe",
-            "-vcodec",
-            "png",
-            "-r",
-            str(fps),
+            *input_args,
+            # Timestamp frames on arrival: the capture loop skips unchanged
+            # frames and the output -r/-fps_mode cfr fills the gaps
+            "-use_wallclock_as_timestamps",
+            "1",
             "-i",
             "-",
             # Video encoding - low latency settings
-            "-c:v",
-            "libx264",
-            "-preset",
-            "ultrafast",
-            "-tune",
-            "zerolatency",  # Changed from stillimage to zerolatency
-            "-crf",
-            str(quality),
-            "-pix_fmt",
-            "yuv420p",
+            *output_args,
             "-r",
             str(fps),
+            "-fps_mode",
+            "cfr",
+            # Exactly one keyframe per segment, placed on the segment boundary,
+            # so raising segment_duration doesn't add redundant I-frames
             "-g",
-            str(fps),  # Keyframe every second (faster segment start)
+            str(fps * segment_time),
+            "-force_key_frames",
+            f"expr:gte(t,n_forced*{segment_time})",
             "-sc_threshold",
             "0",
             # Low latency HLS settings
             "-f",
             "hls",
             "-hls_time",
-            str(segment_time),  # 2 second segments
+            str(segment_time),
             "-hls_list_size",
-            "3",  # Minimal playlist (3 x 2s = 6s)
+            "6",  # Players still start near the live edge, this is headroom
             "-hls_flags",
-            "delete_segments+discont_start+omit_endlist+split_by_time",
+            # temp_file: segments are renamed into place once complete, so
+            # the server never reads (and caches) a half-written file
+            "delete_segments+discont_start+omit_endlist+independent_segments"
+            "+program_date_time+temp_file",
+            # Fragmented MP4 (CMAF) segments, smaller than MPEG-TS
             "-hls_segment_type",
-            "mpegts",
+            "fmp4",
+            "-hls_fmp4_init_filename",
+            f"init_{run_id}.mp4",
             "-hls_segment_filename",
-            str(HLS_DIR / "segment_%03d.ts"),
+            str(HLS_DIR / f"segment_{run_id}_%03d.m4s"),
             str(HLS_DIR / "stream.m3u8"),
         ]
 
         logger.info(f"Starting FFmpeg: {' '.join(cmd)}")
 
-        self.process = subprocess.Popen(
-            cmd,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+        self.process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
         )
+        # The default 64 KiB high-water mark is smaller than a single frame,
+        # which would make every drain() wait. Only push back once FFmpeg is
+        # a couple of frames behind.
+        self.process.stdin.transport.set_write_buffer_limits(high=STDIN_BUFFER_HIGH)
+        self._grow_stdin_pipe(self.process)
+        self._raise_priority(self.process.pid)
         self.running = True
 
-        # Start a thread to log FFmpeg stderr
-        import threading
-
-        def log_ffmpeg_stderr():
-            for line in self.process.stderr:
-                logger.info(f"FFmpeg: {line.decode().strip()}")
+        # Log FFmpeg stderr from the event loop
+        self._stderr_task = asyncio.create_task(self._log_stderr(self.process))
 
-        threading.Thread(target=log_ffmpeg_stderr, daemon=True).start()
+        # Delete the previous run's files in the background
+        if old_dir:
+            loop.run_in_executor(None, shutil.rmtree, old_dir, True)
 
         logger.info("HLS encoder started")
 
-    def write_frame(self, png_data: bytes):
-        """Write a PNG frame to FFmpeg."""
+    async def _log_stderr(self, process: asyncio.subprocess.Process):
+        """Log FFmpeg warnings and errors until the process exits."""
+        while line := await process.stderr.readline():
+            logger.warning(f"FFmpeg: {line.decode(errors='replace').strip()}")
+
+    async def _placeholder_frame(self) -> bytes:
+        """Render a black JPEG at the stream resolution with FFmpeg."""
+        width = self.config.get("width", 1920)
+        height = self.config.get("height", 1080)
+        proc = await asyncio.create_subprocess_exec(
+            "ffmpeg",
+            "-loglevel",
+            "error",
+            "-f",
+            "lavfi",
+            "-i",
+            f"color=c=black:s={width}x{height}",
+            "-frames:v",
+            "1",
+            "-f",
+            "mjpeg",
+            "-",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        out, _ = await proc.communicate()
+        return out
+
+    async def preroll(self):
+        """Feed a placeholder frame until cancelled.
+
+        Chromium takes several seconds to load the dashboard. Keeping FFmpeg
+        fed in the meantime means the playlist and first segments already
+        exist when the first real frame arrives.
+        """
+        frame = await self._placeholder_frame()
+        if not frame:
+            logger.warning("Could not render placeholder frame, skipping pre-roll")
+            return
+        while True:
+            await self.write_frame(frame)
+            await asyncio.sleep(UNCHANGED_FRAME_HEARTBEAT)
+
+    async def write_frame(self, frame_data: bytes):
+        """Write a JPEG frame to FFmpeg."""
         if self.process and self.process.stdin:
             try:
-                self.process.stdin.write(png_data)
-                self.process.stdin.flush()
-            except BrokenPipeError:
-                # Log FFmpeg error before restarting
-                if self.process and self.process.stderr:
-                    stderr = self.process.stderr.read()
-                    if stderr:
-                        logger.error(f"FFmpeg error: {stderr.decode()}")
+                self.process.stdin.write(frame_data)
+                await self.process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                # FFmpeg's own error output is logged by _log_stderr
                 logger.error("FFmpeg pipe broken, restarting encoder")
-                self.restart()
+                await self.restart()
 
-    def restart(self):
+    async def restart(self):
         """Restart the encoder."""
-        self.stop()
-        self.start()
+        await self.stop()
+        await self.start()
 
-    def stop(self):
+    async def stop(self):
         """Stop the FFmpeg process."""
         self.running = False
         if self.process:
             self.process.stdin.close()
-            self.process.terminate()
             try:
-                self.process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
+                self.process.terminate()
+            except ProcessLookupError:
+                pass
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=5)
+            except asyncio.TimeoutError:
                 self.process.kill()
+                await self.process.wait()
+            if self._stderr_task:
+                await self._stderr_task
+                self._stderr_task = None
             self.process = None
             logger.info("HLS encoder stopped")
 
 
+# Headers for files served under /hls/. The playlist must be revalidated on
+# every poll (its ETag makes that a 304), while segment names are unique per
+# encoder run so a finished segment never changes.
+_PLAYLIST_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Access-Control-Allow-Origin": "*",
+}
+_SEGMENT_HEADERS = {
+    "Cache-Control": "public, max-age=31536000, immutable",
+    "Access-Control-Allow-Origin": "*",
+}
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows a gzip response."""
+    wildcard = False
+    for item in accept_encoding.split(","):
+        coding, *params = item.split(";")
+        coding = coding.strip().lower()
+        if coding not in ("gzip", "*"):
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        # An explicit gzip entry overrides the wildcard
+        if coding == "gzip":
+            return q > 0
+        wildcard = q > 0
+    return wildcard
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches etag (weak comparison)."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
 class StreamServer:
     """HTTP server providing HLS streaming endpoints."""
 
@@ -510,29 +930,111 @@ class StreamServer:
         self.capture = capture
         self.encoder = encoder
         self.config = config
-        self.app = web.Application()
+        # Rendered index pages, keyed by the inputs that can change between
+        # requests (ingress path, kiosk detection)
+        self._index_cache: dict[
+            tuple[str, Optional[bool]], tuple[bytes, bytes, str]
+        ] = {}
+        # JSON bodies, keyed by endpoint and the values they report
+        self._json_cache: dict[tuple, bytes] = {}
+        # (mtime_ns, body, etag) of the last playlist read from disk
+        self._playlist_cache: Optional[tuple[int, bytes, str]] = None
+        # Screenshot shared by concurrent snapshot requests before the first
+        # frame has been captured
+        self._snapshot_task: Optional[asyncio.Task] = None
+        # (frame, etag) of the last snapshot served
+        self._snapshot_etag: Optional[tuple[bytes, str]] = None
+        # Least recently used first. Segment names are unique per encoder run
+        # and files appear only once complete, so entries never go stale.
+        self._segment_cache: OrderedDict[str, bytes] = OrderedDict()
+        self.app = web.Application(handler_args={"access_log": None})
+        self.app.on_response_prepare.append(self._on_response_prepare)
         self._setup_routes()
 
     def _setup_routes(self):
         """Set up HTTP routes."""
         self.app.router.add_get("/", self.handle_index)
-        self.app.router.add_get("/stream.m3u8", self.handle_playlist)
-        self.app.router.add_get("/segment_{name}.ts", self.handle_segment)
         self.app.router.add_get("/snapshot.jpg", self.handle_snapshot)
         self.app.router.add_get("/health", self.handle_health)
         self.app.router.add_get("/api/kiosk-status", self.handle_kiosk_status)
-        # Serve HLS files directly
-        self.app.router.add_static("/hls/", HLS_DIR, show_index=False)
+        # The playlist is polled constantly, serve it from memory
+        self.app.router.add_get("/hls/stream.m3u8", self.handle_playlist)
+        # Every viewer fetches the same few segments, serve those from memory.
+        # Only FFmpeg's own file names match, never paths or its .tmp files.
+        self.app.router.add_get(
+            r"/hls/{name:(init|segment)_[\w-]+\.(mp4|m4s)}", self.handle_segment
+        )
+
+    async def _on_response_prepare(
+        self, request: web.Request, response: web.StreamResponse
+    ):
+        """Add HLS caching and CORS headers to stream files."""
+        # aiohttp already disables Nagle on accepted sockets; also ACK the
+        # request immediately so the response isn't held behind a delayed ACK.
+        # Linux clears QUICKACK after use, so it is re-armed per response.
+        if _TCP_QUICKACK is not None and request.transport is not None:
+            sock = request.transport.get_extra_info("socket")
+            if sock is not None:
+                try:
+                    sock.setsockopt(socket.IPPROTO_TCP, _TCP_QUICKACK, 1)
+                except OSError:
+                    pass
+
+        path = request.path
+        if not path.startswith("/hls/"):
+            return
+        if path.endswith(".m3u8"):
+            response.headers.update(_PLAYLIST_HEADERS)
+        elif response.status == 200:
+            # Never mark a 404 immutable, the segment may just not exist yet
+            response.headers.update(_SEGMENT_HEADERS)
+
+    def _json_body(self, key: tuple, data: dict) -> bytes:
+        """Return the cached JSON encoding of data, stored under key."""
+        body = self._json_cache.get(key)
+        if body is None:
+            body = json.dumps(data).encode()
+            self._json_cache[key] = body
+        return body
 
     async def handle_index(self, request: web.Request) -> web.Response:
         """Serve the index page with stream info."""
-        # Build the stream URL based on the request
-        # This handles both direct access (:8099) and ingress access (via HA)
-        host = request.host
-        scheme = request.scheme
-
         # Check if accessed via ingress (X-Ingress-Path header)
         ingress_path = request.headers.get("X-Ingress-Path", "")
+        key = (ingress_path, self.capture.kiosk_mode_detected)
+
+        cached = self._index_cache.get(key)
+        if cached is None:
+            # Ingress paths carry a session token, so don't let them pile up
+            if len(self._index_cache) >= 16:
+                self._index_cache.clear()
+            body = self._render_index(ingress_path).encode()
+            # Compress once per render rather than on every request
+            gzipped = gzip.compress(body, compresslevel=9)
+            digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+            cached = self._index_cache[key] = (body, gzipped, digest)
+        body, gzipped, digest = cached
+
+        # Let browsers reuse the page briefly, then revalidate it with the
+        # ETag. Private, since ingress pages are specific to an HA session.
+        headers = {"Cache-Control": "private, max-age=60", "Vary": "Accept-Encoding"}
+        if _accepts_gzip(request.headers.get("Accept-Encoding", "")):
+            body = gzipped
+            headers["Content-Encoding"] = "gzip"
+            headers["ETag"] = f'"{digest}-gzip"'
+        else:
+            headers["ETag"] = f'"{digest}"'
+        if _etag_matches(request.headers.get("If-None-Match"), headers["ETag"]):
+            return web.Response(status=304, headers=headers)
+
+        return web.Response(
+            body=body, content_type="text/html", charset="utf-8", headers=headers
+        )
+
+    def _render_index(self, ingress_path: str) -> str:
+        """Render the index page HTML."""
+        # Build the stream URL based on the request
+        # This handles both direct access (:8099) and ingress access (via HA)
         if ingress_path:
             # Accessed via HA ingress - use relative URL
             stream_url = f"{ingress_path}/hls/stream.m3u8"
@@ -630,7 +1132,7 @@ class StreamServer:
         </div>
         <div class="config-item">
             <label>Segment Duration</label>
-            <value>{self.config.get("segment_duration", 2)}s</value>
+            <value>{self.config.get("segment_duration", 1)}s</value>
         </div>
     </div>
     
@@ -643,7 +1145,7 @@ class StreamServer:
         const video = document.getElementById('video');
         const streamUrl = '{stream_url}';
         const baseUrl = '{base_url}';
-        const segmentDuration = {self.config.get("segment_duration", 2)};
+        const segmentDuration = {self.config.get("segment_duration", 1)};
         
         if (Hls.isSupported()) {{
             const hls = new Hls({{
@@ -669,120 +1171,235 @@ class StreamServer:
 </body>
 </html>
 """
-        return web.Response(text=html, content_type="text/html")
+        return html
 
     async def handle_playlist(self, request: web.Request) -> web.Response:
-        """Serve the HLS playlist file."""
+        """Serve the HLS playlist, re-reading it only when FFmpeg rewrites it."""
         playlist_path = HLS_DIR / "stream.m3u8"
-        if not playlist_path.exists():
+        try:
+            mtime = playlist_path.stat().st_mtime_ns
+        except FileNotFoundError:
             return web.Response(status=503, text="Stream not ready yet")
 
-        return web.FileResponse(
-            playlist_path,
-            headers={
-                "Content-Type": "application/vnd.apple.mpegurl",
-                "Cache-Control": "no-cache, no-store, must-revalidate",
-                "Access-Control-Allow-Origin": "*",
-            },
+        if self._playlist_cache is None or self._playlist_cache[0] != mtime:
+            loop = asyncio.get_running_loop()
+            try:
+                data = await loop.run_in_executor(None, playlist_path.read_bytes)
+            except FileNotFoundError:
+                return web.Response(status=503, text="Stream not ready yet")
+            etag = f'"{hashlib.blake2b(data, digest_size=8).hexdigest()}"'
+            self._playlist_cache = (mtime, data, etag)
+        _, data, etag = self._playlist_cache
+
+        if _etag_matches(request.headers.get("If-None-Match"), etag):
+            return web.Response(status=304, headers={"ETag": etag})
+
+        return web.Response(
+            body=data,
+            content_type="application/vnd.apple.mpegurl",
+            headers={"ETag": etag},
         )
 
     async def handle_segment(self, request: web.Request) -> web.Response:
-        """Serve HLS segment files."""
+        """Serve an fMP4 init or media segment, reading each file only once."""
         name = request.match_info["name"]
-        segment_path = HLS_DIR / f"segment_{name}.ts"
-
-        if not segment_path.exists():
-            return web.Response(status=404, text="Segment not found")
+        data = self._segment_cache.get(name)
+        if data is None:
+            loop = asyncio.get_running_loop()
+            try:
+                data = await loop.run_in_executor(None, (HLS_DIR / name).read_bytes)
+            except FileNotFoundError:
+                raise web.HTTPNotFound()
+            self._segment_cache[name] = data
+            if len(self._segment_cache) > SEGMENT_CACHE_SIZE:
+                self._segment_cache.popitem(last=False)
+        else:
+            self._segment_cache.move_to_end(name)
 
-        return web.FileResponse(
-            segment_path,
-            headers={
-                "Content-Type": "video/mp2t",
-                "Cache-Control": "max-age=3600",
-                "Access-Control-Allow-Origin": "*",
-            },
-        )
+        return web.Response(body=data, content_type="video/mp4")
 
     async def handle_snapshot(self, request: web.Request) -> web.Response:
         """Handle single snapshot requests."""
-        png_data = await self.capture.capture_frame()
-
-        # Convert PNG to JPEG (must convert RGBA to RGB first)
-        img = Image.open(io.BytesIO(png_data))
-        if img.mode in ("RGBA", "LA", "P"):
-            img = img.convert("RGB")
-        output = io.BytesIO()
-        img.save(output, format="JPEG", quality=85)
-
-        return web.Response(
-            body=output.getvalue(),
-            content_type="image/jpeg",
-            headers={"Cache-Control": "no-cache"},
-        )
+        # The capture loop keeps its latest frame at most one frame interval
+        # old (or current, while the page is idle), so reuse it rather than
+        # taking another screenshot. Chromium encodes the JPEG itself.
+        jpeg_data = self.capture.latest_frame
+        if jpeg_data is None:
+            if not self.capture.driver:
+                return web.Response(status=503, text="Dashboard is still loading")
+            # Requests arriving while a screenshot is in flight share it
+            # instead of queueing more on the CDP thread
+            if self._snapshot_task is None:
+                self._snapshot_task = asyncio.create_task(
+                    self.capture.capture_jpeg(self.capture.frame_quality)
+                )
+                self._snapshot_task.add_done_callback(self._clear_snapshot_task)
+            jpeg_data = await asyncio.shield(self._snapshot_task)
+
+        # Hash each frame at most once, however often it is polled. Identical
+        # frames hash the same, so pollers get a 304 while the page is idle.
+        if self._snapshot_etag is None or self._snapshot_etag[0] is not jpeg_data:
+            digest = hashlib.blake2b(jpeg_data, digest_size=8).hexdigest()
+            self._snapshot_etag = (jpeg_data, f'"{digest}"')
+        etag = self._snapshot_etag[1]
+
+        headers = {"Cache-Control": "no-cache", "ETag": etag}
+        if _etag_matches(request.headers.get("If-None-Match"), etag):
+            return web.Response(status=304, headers=headers)
+
+        return web.Response(body=jpeg_data, content_type="image/jpeg", headers=headers)
+
+    def _clear_snapshot_task(self, task: asyncio.Task):
+        """Forget the shared screenshot once it has finished."""
+        self._snapshot_task = None
+        # Every waiting request may have disconnected, so retrieve the error
+        # here rather than leaving it unobserved
+        error = None if task.cancelled() else task.exception()
+        if error:
+            logger.error(f"Snapshot failed: {error}", exc_info=error)
 
     async def handle_health(self, request: web.Request) -> web.Response:
         """Health check endpoint."""
         playlist_exists = (HLS_DIR / "stream.m3u8").exists()
-        return web.json_response(
+        body = self._json_body(
+            ("health", self.encoder.running, playlist_exists),
             {
                 "status": "healthy" if playlist_exists else "starting",
                 "encoder_running": self.encoder.running,
                 "stream_ready": playlist_exists,
-            }
+            },
         )
+        return web.Response(body=body, content_type="application/json")
 
     async def handle_kiosk_status(self, request: web.Request) -> web.Response:
         """Return kiosk-mode detection status."""
         kiosk_enabled = self.config.get("kiosk_mode", True)
-        return web.json_response(
+        kiosk_detected = self.capture.kiosk_mode_detected
+        body = self._json_body(
+            ("kiosk", kiosk_detected),
             {
                 "kiosk_mode_enabled": kiosk_enabled,
-                "kiosk_mode_detected": self.capture.kiosk_mode_detected,
-                "needs_install": kiosk_enabled
-                and self.capture.kiosk_mode_detected is False,
-            }
+                "kiosk_mode_detected": kiosk_detected,
+                "needs_install": kiosk_enabled and kiosk_detected is False,
+            },
         )
+        return web.Response(body=body, content_type="application/json")
+
 
+def _put_latest(queue: asyncio.Queue, item):
+    """Queue item, dropping the oldest queued item if the queue is full."""
+    try:
+        queue.put_nowait(item)
+    except asyncio.QueueFull:
+        queue.get_nowait()
+        queue.put_nowait(item)
 
-async def capture_loop(capture: DashboardCapture, encoder: HLSEncoder, config: dict):
-    """Main loop that captures frames and feeds them to the encoder."""
-    fps = config.get("fps", 10)
+
+async def capture_producer(
+    capture: DashboardCapture, queue: asyncio.Queue, config: dict
+):
+    """Capture frames at the target FPS and queue the ones worth encoding."""
+    fps = config.get("fps", 5)
     frame_interval = 1.0 / fps
     frame_count = 0
+    # Frame slots skipped because capture fell behind schedule
+    skipped_slots = 0
+    # Log progress every 10 seconds at full rate
+    log_every = fps * 10
+    next_log = log_every
 
     logger.info(f"Starting capture loop at {fps} fps ({frame_interval:.3f}s interval)")
 
-    while encoder.running:
-        try:
-            start_time = asyncio.get_event_loop().time()
+    # Frames are scheduled against a fixed monotonic deadline so capture time
+    # doesn't accumulate into drift
+    loop = asyncio.get_running_loop()
+    deadline = loop.time()
 
-            # Capture frame
-            png_data = await capture.capture_frame()
-            frame_count += 1
+    last_frame: Optional[bytes] = None
+    last_write = 0.0
+    # Whether the last capture was identical to the frame before it
+    static = False
 
-            # Feed to encoder
-            encoder.write_frame(png_data)
+    while True:
+        try:
+            # While the screen is static, only take a screenshot when the page
+            # reports a DOM change or the heartbeat is due. Content that changes
+            # without DOM mutations (video, canvas) never looks static.
+            heartbeat_due = loop.time() - last_write >= UNCHANGED_FRAME_HEARTBEAT
+            if not static or heartbeat_due or await capture.page_changed():
+                # Capture frame
+                frame_data = await capture.capture_frame()
+                frame_count += 1
+
+                # Queue for the encoder, skipping frames identical to the last
+                # one (a length check plus memcmp, cheaper than hashing every
+                # frame). If the encoder falls behind, the freshest frame
+                # replaces the oldest.
+                static = frame_data == last_frame
+                if not static or heartbeat_due:
+                    _put_latest(queue, frame_data)
+                    last_frame = frame_data
+                    last_write = loop.time()
+
+                if frame_count == next_log:
+                    next_log += log_every
+                    logger.info(
+                        "Captured %d frames (%d slots skipped)",
+                        frame_count,
+                        skipped_slots,
+                    )
+                    if logger.isEnabledFor(logging.DEBUG):
+                        hls_files = [f.name for f in HLS_DIR.iterdir()]
+                        logger.debug(f"HLS files: {hls_files}")
+
+            # Wait for the next frame slot. A frame that is less than one slot
+            # late is captured right away; if we're further behind, skip the
+            # missed slots but stay on the original schedule.
+            deadline += frame_interval
+            now = loop.time()
+            if now - deadline > frame_interval:
+                missed = math.ceil((now - deadline) / frame_interval)
+                deadline += missed * frame_interval
+                skipped_slots += missed
+            if deadline > now:
+                await asyncio.sleep(deadline - now)
 
-            # Log periodically (every second at 10fps)
-            if frame_count % fps == 0:
-                hls_files = list(HLS_DIR.glob("*"))
-                logger.info(
-                    f"Captured {frame_count} frames, HLS files: {[f.name for f in hls_files]}"
-                )
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error(f"Error in capture loop: {e}", exc_info=True)
+            await asyncio.sleep(0.1)
 
-            # Wait for next frame, accounting for capture time
-            elapsed = asyncio.get_event_loop().time() - start_time
-            sleep_time = max(0, frame_interval - elapsed)
-            if sleep_time > 0:
-                await asyncio.sleep(sleep_time)
 
+async def encode_consumer(encoder: HLSEncoder, queue: asyncio.Queue):
+    """Feed queued frames to the encoder."""
+    while True:
+        try:
+            frame_data = await queue.get()
+            await encoder.write_frame(frame_data)
         except asyncio.CancelledError:
             break
         except Exception as e:
-            logger.error(f"Error in capture loop: {e}", exc_info=True)
+            logger.error(f"Error in encode loop: {e}", exc_info=True)
             await asyncio.sleep(0.1)
 
 
+class _ShutdownRequested(Exception):
+    """Raised to stop the main task group on SIGTERM/SIGINT."""
+
+
+async def _wait_for_shutdown_signal():
+    """Wait for SIGTERM/SIGINT, then raise _ShutdownRequested."""
+    loop = asyncio.get_running_loop()
+    stop_event = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    await stop_event.wait()
+    logger.info("Shutdown signal received")
+    raise _ShutdownRequested
+
+
 async def main():
     """Main entry point."""
     # Load configuration
@@ -801,7 +1418,8 @@ async def main():
         "height": 1080,
         "quality": 23,
         "fps": 5,
-        "segment_duration": 2,  # Short segments for low latency
+        "jpeg_quality": FRAME_JPEG_QUALITY,
+        "segment_duration": 1,  # One keyframe interval, for low latency
     }
     for key, value in defaults.items():
         if key not in config:
@@ -810,9 +1428,7 @@ async def main():
     # Don't log the access token
     config_log = {k: v for k, v in config.items() if k != "access_token"}
     config_log["access_token"] = "***" if config.get("access_token") else "(not set)"
-    logger.info(
-        f"Starting Dashboard Streams with config: {json.dumps(config_log, indent=2)}"
-    )
+    logger.info("Starting Dashboard Streams with config: %s", _LazyJson(config_log))
 
     # Check for access token
     if not config.get("access_token"):
@@ -826,49 +1442,50 @@ async def main():
     encoder = HLSEncoder(config)
     server = StreamServer(capture, encoder, config)
 
-    # Start capture
-    await capture.start()
-
-    # Start encoder
-    encoder.start()
-
-    # Start capture loop
-    capture_task = asyncio.create_task(capture_loop(capture, encoder, config))
-
-    # Start HTTP server
+    # Start the encoder and HTTP server first and pre-roll a placeholder, so
+    # players can start buffering while Chromium loads the dashboard
+    await encoder.start()
+    preroll = asyncio.create_task(encoder.preroll())
     runner = web.AppRunner(server.app)
-    await runner.setup()
-    site = web.TCPSite(runner, "0.0.0.0", 8099)
-    await site.start()
-    logger.info("Stream server running on http://0.0.0.0:8099")
-
-    # Handle shutdown
-    loop = asyncio.get_event_loop()
-    stop_event = asyncio.Event()
-
-    def shutdown_handler():
-        logger.info("Shutdown signal received")
-        stop_event.set()
-
-    for sig in (signal.SIGTERM, signal.SIGINT):
-        loop.add_signal_handler(sig, shutdown_handler)
-
-    # Wait for shutdown
-    await stop_event.wait()
-
-    # Cleanup
-    capture_task.cancel()
     try:
-        await capture_task
-    except asyncio.CancelledError:
-        pass
+        await runner.setup()
+        site = web.TCPSite(runner, "0.0.0.0", 8099)
+        await site.start()
+        logger.info("Stream server running on http://0.0.0.0:8099")
+
+        # Run the capture and encode loops, connected by a small frame queue so
+        # a slow FFmpeg write never delays the next capture. Both loops log and
+        # retry their own errors, so the group only ends on a shutdown signal.
+        frame_queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+        try:
+            async with asyncio.TaskGroup() as tg:
+                # Watch for signals before starting Chromium, so a stop while
+                # the dashboard loads cancels the startup below
+                tg.create_task(_wait_for_shutdown_signal())
 
-    encoder.stop()
-    await capture.stop()
-    await runner.cleanup()
+                # Start capture
+                try:
+                    await capture.start()
+                finally:
+                    preroll.cancel()
+                    await asyncio.gather(preroll, return_exceptions=True)
+
+                tg.create_task(capture_producer(capture, frame_queue, config))
+                tg.create_task(encode_consumer(encoder, frame_queue))
+        except* _ShutdownRequested:
+            pass
+    finally:
+        preroll.cancel()
+        await asyncio.gather(preroll, return_exceptions=True)
+        await encoder.stop()
+        await capture.stop()
+        await runner.cleanup()
 
     logger.info("Dashboard Streams stopped")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # uvloop has finer timer granularity for frame pacing and faster sockets
+    loop_factory = uvloop.new_event_loop if uvloop else None
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        runner.run(main())